@@ -0,0 +1,123 @@
+"""
+Throughput benchmark for the chat server's serving modes.
+Starts the app once per mode and drives concurrent WebSocket chat turns against it.
+
+Run from the repo root:
+    python -m src.backend.bench_serving --connections 32 --turns 5
+
+Note: turns go through the real OpenAI, Upstash and Make.com dependencies.
+"""
+
+from typing import Dict, List
+import os
+import sys
+import time
+import uuid
+import asyncio
+import argparse
+import statistics
+import subprocess
+import httpx
+import websockets
+
+# Current deployment: one process, uvicorn defaults
+SINGLE_PROCESS = []
+
+
+def production_args(workers: int) -> List[str]:
+    return ["--workers", str(workers), "--loop", "uvloop", "--http", "httptools"]
+
+
+async def wait_until_ready(base_url: str, timeout: float) -> None:
+    """Poll the readiness probe until the server has warmed its connections."""
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                response = await client.get(f"{base_url}/ready")
+                if response.status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.5)
+    raise TimeoutError(f"Server at {base_url} did not become ready in {timeout}s")
+
+
+async def run_connection(ws_url: str, message: str, turns: int, latencies: List[float]) -> int:
+    """Open one chat socket and send `turns` messages sequentially."""
+    completed = 0
+    async with websockets.connect(f"{ws_url}/ws/bench-{uuid.uuid4().hex[:8]}") as websocket:
+        for _ in range(turns):
+            started = time.perf_counter()
+            await websocket.send(message)
+            await websocket.recv()
+            latencies.append(time.perf_counter() - started)
+            completed += 1
+    return completed
+
+
+async def drive_load(port: int, connections: int, turns: int, message: str) -> Dict[str, float]:
+    latencies: List[float] = []
+    started = time.perf_counter()
+    results = await asyncio.gather(
+        *(run_connection(f"ws://127.0.0.1:{port}", message, turns, latencies) for _ in range(connections)),
+        return_exceptions=True
+    )
+    elapsed = time.perf_counter() - started
+    completed = sum(r for r in results if isinstance(r, int))
+    errors = sum(1 for r in results if isinstance(r, Exception))
+    latencies.sort()
+    return {
+        "turns": completed,
+        "errors": errors,
+        "elapsed": elapsed,
+        "throughput": completed / elapsed if elapsed else 0.0,
+        "p50": statistics.median(latencies) if latencies else 0.0,
+        "p95": latencies[int(len(latencies) * 0.95) - 1] if latencies else 0.0,
+    }
+
+
+def bench_mode(name: str, extra_args: List[str], args: argparse.Namespace) -> Dict[str, float]:
+    print(f"\n[Bench] Starting {name} server on port {args.port}...")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.backend.main:app",
+         "--host", "127.0.0.1", "--port", str(args.port), "--log-level", "warning", *extra_args],
+        env={**os.environ, "PYTHONPATH": os.getcwd()},
+        stdout=subprocess.DEVNULL
+    )
+    try:
+        asyncio.run(wait_until_ready(f"http://127.0.0.1:{args.port}", args.startup_timeout))
+        print(f"[Bench] {name} ready, running {args.connections} connections x {args.turns} turns")
+        return asyncio.run(drive_load(args.port, args.connections, args.turns, args.message))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare single-process and multi-worker throughput")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "4")))
+    parser.add_argument("--connections", type=int, default=16)
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--message", default="What services do you offer?")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--startup-timeout", type=float, default=60.0)
+    args = parser.parse_args()
+
+    modes = {
+        "single-process": SINGLE_PROCESS,
+        f"{args.workers}-worker uvloop/httptools": production_args(args.workers),
+    }
+    results = {name: bench_mode(name, extra_args, args) for name, extra_args in modes.items()}
+
+    print(f"\n{'mode':<32}{'turns':>8}{'errors':>8}{'turns/s':>10}{'p50 s':>9}{'p95 s':>9}")
+    for name, r in results.items():
+        print(f"{name:<32}{r['turns']:>8}{r['errors']:>8}{r['throughput']:>10.2f}{r['p50']:>9.2f}{r['p95']:>9.2f}")
+
+    baseline, production = results.values()
+    if baseline["throughput"]:
+        print(f"\nSpeedup: {production['throughput'] / baseline['throughput']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+"""
+Append-only lead-funnel event log for the ricco.AI chatbot.
+Events are queued by the chat path and written to SQL in batches by a background thread.
+
+Funnel report:
+    python -m src.backend.lead_events --db sqlite:///lead_events.db
+"""
+
+from typing import Dict, List, Optional
+import os
+import json
+import time
+import queue
+import argparse
+import threading
+import statistics
+from sqlalchemy import (
+    Column, Float, Index, Integer, MetaData, String, Table, Text,
+    create_engine, event, func, insert, select
+)
+from sqlalchemy.exc import OperationalError
+
+LEAD_EVENTS_DB_URL = os.getenv("LEAD_EVENTS_DB_URL", "sqlite:///lead_events.db")
+
+# Funnel stages, in order
+CONSULTATION_SUGGESTED = "consultation_suggested"
+BOOKING_LINK_SERVED = "booking_link_served"
+BOOKING_COMPLETED = "booking_completed"
+FUNNEL_STAGES = [CONSULTATION_SUGGESTED, BOOKING_LINK_SERVED, BOOKING_COMPLETED]
+
+metadata = MetaData()
+
+lead_events = Table(
+    "lead_events",
+    metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("session_id", String(128), nullable=False),
+    Column("event", String(64), nullable=False),
+    Column("created_at", Float, nullable=False),
+    Column("details", Text),
+    Index("ix_lead_events_event_session", "event", "session_id", "created_at"),
+)
+
+
+def get_engine(db_url: str = LEAD_EVENTS_DB_URL):
+    """Create an engine; SQLite uses WAL so several workers can append concurrently."""
+    engine = create_engine(db_url)
+    if engine.dialect.name == "sqlite":
+        @event.listens_for(engine, "connect")
+        def set_sqlite_pragmas(dbapi_connection, _):
+            cursor = dbapi_connection.cursor()
+            # First, so the WAL switch waits out other workers connecting at the same time
+            cursor.execute("PRAGMA busy_timeout=5000")
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+            cursor.close()
+    try:
+        metadata.create_all(engine)
+    except OperationalError as e:
+        # Another worker created the table between the existence check and CREATE
+        if "already exists" not in str(e):
+            engine.dispose()
+            raise
+        metadata.create_all(engine)
+    return engine
+
+
+class LeadEventWriter:
+    """Queue lead events from the chat path and flush them to disk in batches."""
+
+    def __init__(self, db_url: str = LEAD_EVENTS_DB_URL, batch_size: int = 200,
+                 flush_interval: float = 1.0, max_queue: int = 10000) -> None:
+        self.db_url = db_url
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.events: queue.Queue = queue.Queue(maxsize=max_queue)
+        self.thread: Optional[threading.Thread] = None
+        self.dropped = 0
+
+    def start(self) -> None:
+        """Start the background writer thread."""
+        if self.thread is not None and self.thread.is_alive():
+            return
+        self.thread = threading.Thread(target=self._run, name="lead-event-writer", daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Flush queued events and stop the writer thread."""
+        if self.thread is None:
+            return
+        self.events.put(None)
+        self.thread.join(timeout)
+        self.thread = None
+
+    def record(self, session_id: str, event_name: str, **details) -> None:
+        """Queue an event without blocking; events are dropped if the queue is full."""
+        try:
+            self.events.put_nowait({
+                "session_id": session_id or "",
+                "event": event_name,
+                "created_at": time.time(),
+                "details": json.dumps(details) if details else None,
+            })
+        except queue.Full:
+            self.dropped += 1
+            print(f"[LeadEvents] Queue full, dropped '{event_name}' for session: {session_id}")
+
+    def _connect(self):
+        """Open the database, retrying with backoff so a locked or missing DB doesn't kill the writer."""
+        delay = 0.5
+        while True:
+            try:
+                return get_engine(self.db_url)
+            except Exception as e:
+                print(f"[LeadEvents] Could not open {self.db_url}, retrying in {delay:.1f}s: {str(e)}")
+                time.sleep(delay)
+                delay = min(delay * 2, 30.0)
+
+    def _run(self) -> None:
+        engine = self._connect()
+        stopping = False
+        while not stopping:
+            batch: List[Dict] = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    item = self.events.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            if batch:
+                self._flush(engine, batch)
+        engine.dispose()
+
+    def _flush(self, engine, batch: List[Dict]) -> None:
+        try:
+            with engine.begin() as conn:
+                conn.execute(insert(lead_events), batch)
+        except Exception as e:
+            print(f"[LeadEvents] Error writing {len(batch)} events: {str(e)}")
+
+
+def percentile(values: List[float], pct: float) -> float:
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def funnel_report(db_url: str, since: Optional[float] = None) -> Dict:
+    """Compute per-stage session counts, conversion and time-to-booking.
+
+    Conversion follows the suggested -> served -> completed funnel, counting a stage
+    only for sessions that reached the previous one first. Sessions that were served
+    a link without a prior suggestion (explicit booking requests) are reported as
+    the direct path.
+    """
+    engine = get_engine(db_url)
+    # First time each session reached each stage
+    first_seen = [
+        func.min(lead_events.c.created_at).filter(lead_events.c.event == stage).label(stage)
+        for stage in FUNNEL_STAGES
+    ]
+    query = select(lead_events.c.session_id, *first_seen).group_by(lead_events.c.session_id)
+    if since is not None:
+        query = query.where(lead_events.c.created_at >= since)
+
+    counts = {stage: 0 for stage in FUNNEL_STAGES}
+    funnel = {stage: 0 for stage in FUNNEL_STAGES}
+    direct = {BOOKING_LINK_SERVED: 0, BOOKING_COMPLETED: 0}
+    time_to_booking: List[float] = []
+    with engine.connect() as conn:
+        for row in conn.execution_options(yield_per=5000).execute(query):
+            for stage in FUNNEL_STAGES:
+                if row._mapping[stage] is not None:
+                    counts[stage] += 1
+
+            # Walk the funnel in order; a stage counts only after the previous one
+            reached_at = None
+            for stage in FUNNEL_STAGES:
+                seen = row._mapping[stage]
+                if seen is None or (reached_at is not None and seen < reached_at):
+                    break
+                funnel[stage] += 1
+                reached_at = seen
+
+            suggested = row._mapping[CONSULTATION_SUGGESTED]
+            served = row._mapping[BOOKING_LINK_SERVED]
+            completed = row._mapping[BOOKING_COMPLETED]
+            if served is not None and (suggested is None or suggested > served):
+                direct[BOOKING_LINK_SERVED] += 1
+                if completed is not None and completed >= served:
+                    direct[BOOKING_COMPLETED] += 1
+            if served is not None and completed is not None and completed >= served:
+                time_to_booking.append(completed - served)
+    engine.dispose()
+
+    def rate(converted: int, total: int) -> float:
+        return converted / total if total else 0.0
+
+    conversion = {}
+    for previous, stage in zip(FUNNEL_STAGES, FUNNEL_STAGES[1:]):
+        conversion[f"{previous}->{stage}"] = rate(funnel[stage], funnel[previous])
+    first, last = FUNNEL_STAGES[0], FUNNEL_STAGES[-1]
+    conversion[f"{first}->{last}"] = rate(funnel[last], funnel[first])
+    conversion[f"direct {BOOKING_LINK_SERVED}->{BOOKING_COMPLETED}"] = rate(
+        direct[BOOKING_COMPLETED], direct[BOOKING_LINK_SERVED]
+    )
+
+    time_to_booking.sort()
+    return {
+        "sessions": counts,
+        "funnel": funnel,
+        "direct": direct,
+        "conversion": conversion,
+        "time_to_booking": {
+            "count": len(time_to_booking),
+            "median_s": statistics.median(time_to_booking) if time_to_booking else None,
+            "p90_s": percentile(time_to_booking, 90) if time_to_booking else None,
+        },
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Lead funnel conversion and time-to-booking")
+    parser.add_argument("--db", default=LEAD_EVENTS_DB_URL, help="SQLAlchemy database URL")
+    parser.add_argument("--days", type=float, help="Only include events from the last N days")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    since = time.time() - args.days * 86400 if args.days else None
+    report = funnel_report(args.db, since)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print("Sessions per stage:")
+    for stage, count in report["sessions"].items():
+        print(f"  {stage:<26}{count:>10}")
+    print("Suggested funnel:")
+    for stage, count in report["funnel"].items():
+        print(f"  {stage:<26}{count:>10}")
+    print("Direct booking requests (no prior suggestion):")
+    for stage, count in report["direct"].items():
+        print(f"  {stage:<26}{count:>10}")
+    print("Conversion:")
+    for step, rate in report["conversion"].items():
+        print(f"  {step:<50}{rate:>8.1%}")
+    ttb = report["time_to_booking"]
+    print(f"Time to booking ({ttb['count']} sessions):")
+    if ttb["count"]:
+        print(f"  median {ttb['median_s'] / 60:.1f} min, p90 {ttb['p90_s'] / 60:.1f} min")
+
+
+if __name__ == "__main__":
+    main()
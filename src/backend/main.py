@@ -4,12 +4,17 @@ Handles chat functionality, message processing, and response generation.
 """
 
 from typing import Dict, List, Optional, Union
+from contextlib import contextmanager
 import os
+import asyncio
 import json
 import re
 import traceback
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+import time
+import threading
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Header
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from dotenv import load_dotenv
 from langchain.schema import HumanMessage, AIMessage
 from langchain_community.chat_message_histories import UpstashRedisChatMessageHistory
@@ -17,6 +22,10 @@ from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain_pinecone import PineconeVectorStore
 from pinecone import Pinecone
 from openai import OpenAI
+from src.backend.lead_events import (
+    LeadEventWriter, CONSULTATION_SUGGESTED, BOOKING_LINK_SERVED, BOOKING_COMPLETED
+)
+from src.backend.tracing import Tracer, TurnProfiler
 import httpx
 import datetime
 from pydantic import BaseModel
@@ -27,6 +36,12 @@ import smtplib
 # Initialize FastAPI app
 app = FastAPI()
 
+# Per-turn spans, exported in batches to a local OTLP/JSON file
+tracer = Tracer(service_name="ricco-chatbot")
+
+# Sampling profiler switched on through the admin endpoint
+profiler = TurnProfiler()
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -36,6 +51,175 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Make.com scenario that creates personalised scheduling links
+MAKE_WEBHOOK_URL = os.getenv("MAKE_WEBHOOK_URL", "https://hook.us1.make.com/ke4n6kdh0kxwwrljdq9jesotouirragi")
+
+# Hard ceiling on how long a single chat turn may take end to end
+TURN_DEADLINE_SECONDS = float(os.getenv("TURN_DEADLINE_SECONDS", "8"))
+
+# Minimum remaining budget (seconds) before each stage is attempted.
+# Stages degrade in this order as the budget runs low.
+RELEVANCE_FILTER_RESERVE = 5.0
+BOOKING_WEBHOOK_RESERVE = 3.0
+LLM_RESPONSE_RESERVE = 1.5
+
+# Per-dependency limit on startup warm-up, so a stalled dependency can't hold a worker out of service
+WARM_UP_TIMEOUT_SECONDS = 5.0
+
+# Per-session state is kept in Upstash next to the history, so any worker can pick a session up
+SESSION_STATE_KEY_PREFIX = "session_state:"
+SESSION_STATE_TTL_SECONDS = 86400
+
+# httpx drops idle pooled connections after 5s; re-warm clients on connect past this
+POOL_KEEPALIVE_SECONDS = 5.0
+# Request timeout for connect-time warm-ups, which run alongside the user's first turn
+PREFETCH_WARM_TIMEOUT_SECONDS = 2.0
+
+LLM_FALLBACK_REPLY = "I apologize, but I'm having trouble. Could you tell me more about what you're looking to achieve?"
+
+class TurnBudget:
+    """Deadline budget shared by every stage of a single chat turn."""
+
+    def __init__(self, session_id: str, seconds: float = TURN_DEADLINE_SECONDS) -> None:
+        self.session_id = session_id
+        self.deadline = time.monotonic() + seconds
+        self.degradations: List[str] = []
+
+    def remaining(self) -> float:
+        """Seconds left before the turn deadline."""
+        return max(0.0, self.deadline - time.monotonic())
+
+    def allows(self, reserve: float) -> bool:
+        """Check if enough budget is left to attempt a stage needing `reserve` seconds."""
+        return self.remaining() >= reserve
+
+    def degrade(self, stage: str) -> None:
+        """Record that a stage was skipped or replaced to stay within the deadline."""
+        self.degradations.append(stage)
+        print(f"[Budget] {self.session_id}: degraded '{stage}' with {self.remaining():.2f}s left")
+
+# Brownout modes, each including the degradations of the ones before it
+BROWNOUT_NORMAL = 0
+BROWNOUT_SHORT_RESPONSES = 1
+BROWNOUT_LOCAL_CLASSIFIERS = 2
+BROWNOUT_CANNED_REPLIES = 3
+BROWNOUT_MODE_NAMES = ["normal", "short_responses", "local_classifiers", "canned_replies"]
+
+# Load needed to enter modes 1..3: in-flight LLM calls, turns in progress, recent LLM latency (s)
+BROWNOUT_LLM_IN_FLIGHT = [8, 16, 32]
+BROWNOUT_QUEUE_DEPTH = [10, 25, 50]
+BROWNOUT_LATENCY = [2.5, 4.0, 6.0]
+
+# A mode is only left once every signal is below this fraction of its entry threshold
+BROWNOUT_EXIT_RATIO = 0.6
+# ...and the controller has held the mode for at least this long
+BROWNOUT_MIN_DWELL_SECONDS = 15.0
+# Recorded LLM latency halves every this many seconds without a new call
+BROWNOUT_LATENCY_HALF_LIFE_SECONDS = 10.0
+
+BROWNOUT_MAX_TOKENS = 50
+
+class BrownoutController:
+    """Step the bot through cheaper modes as load rises, with hysteresis on the way back."""
+
+    def __init__(self) -> None:
+        self.mode = BROWNOUT_NORMAL
+        self.mode_since = time.monotonic()
+        self.llm_in_flight = 0
+        self.turns_in_flight = 0
+        # Exponentially weighted LLM call latency, and when it was last updated
+        self.latency = 0.0
+        self.latency_at = time.monotonic()
+        self.mode_changes: Dict[str, int] = {}
+        self.lock = threading.Lock()
+
+    def recent_latency(self) -> float:
+        """LLM latency decayed by the time since the last call finished.
+
+        In canned-replies mode no LLM calls are made, so without decay the latency
+        that triggered it would never fall and the mode could not be left.
+        """
+        idle = time.monotonic() - self.latency_at
+        return self.latency * 0.5 ** (idle / BROWNOUT_LATENCY_HALF_LIFE_SECONDS)
+
+    def status(self) -> Dict:
+        return {
+            "mode": BROWNOUT_MODE_NAMES[self.mode],
+            "mode_for_seconds": round(time.monotonic() - self.mode_since, 1),
+            "llm_in_flight": self.llm_in_flight,
+            "turns_in_flight": self.turns_in_flight,
+            "llm_latency": round(self.recent_latency(), 3),
+            "mode_changes": dict(self.mode_changes),
+        }
+
+    def signals(self) -> List[float]:
+        return [self.llm_in_flight, self.turns_in_flight, self.recent_latency()]
+
+    def load_level(self, ratio: float = 1.0) -> int:
+        """Highest mode whose entry threshold (scaled by `ratio`) any signal reaches."""
+        thresholds = [BROWNOUT_LLM_IN_FLIGHT, BROWNOUT_QUEUE_DEPTH, BROWNOUT_LATENCY]
+        level = BROWNOUT_NORMAL
+        for value, limits in zip(self.signals(), thresholds):
+            for mode, limit in enumerate(limits, 1):
+                if value >= limit * ratio:
+                    level = max(level, mode)
+        return level
+
+    def evaluate(self) -> None:
+        """Move at most one mode up or down based on current load."""
+        with self.lock:
+            if self.load_level() > self.mode:
+                self._set_mode(self.mode + 1)
+            elif (self.mode > BROWNOUT_NORMAL
+                  and self.load_level(BROWNOUT_EXIT_RATIO) < self.mode
+                  and time.monotonic() - self.mode_since >= BROWNOUT_MIN_DWELL_SECONDS):
+                self._set_mode(self.mode - 1)
+
+    def _set_mode(self, mode: int) -> None:
+        previous = BROWNOUT_MODE_NAMES[self.mode]
+        self.mode = mode
+        self.mode_since = time.monotonic()
+        transition = f"{previous}->{BROWNOUT_MODE_NAMES[mode]}"
+        self.mode_changes[transition] = self.mode_changes.get(transition, 0) + 1
+        print("[Metric] " + json.dumps({
+            "metric": "brownout_mode_change",
+            "from": previous,
+            "to": BROWNOUT_MODE_NAMES[mode],
+            "mode": mode,
+            "llm_in_flight": self.llm_in_flight,
+            "turns_in_flight": self.turns_in_flight,
+            "llm_latency": round(self.recent_latency(), 3),
+            "pid": os.getpid(),
+        }))
+
+    def turn_started(self) -> None:
+        with self.lock:
+            self.turns_in_flight += 1
+        self.evaluate()
+
+    def turn_finished(self) -> None:
+        with self.lock:
+            self.turns_in_flight -= 1
+        self.evaluate()
+
+    @contextmanager
+    def llm_call(self):
+        """Track an OpenAI call's concurrency and latency."""
+        with self.lock:
+            self.llm_in_flight += 1
+        self.evaluate()
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            latency = time.monotonic() - started
+            with self.lock:
+                self.llm_in_flight -= 1
+                previous = self.recent_latency()
+                self.latency = latency if previous == 0.0 else 0.8 * previous + 0.2 * latency
+                self.latency_at = time.monotonic()
+            self.evaluate()
+
 class ChatBot:
     def __init__(self) -> None:
         """Initialize ChatBot with necessary configurations and clients."""
@@ -49,7 +233,38 @@ class ChatBot:
         self.conversation_states: Dict = {}
         
         # Initialize Redis configuration
+        self.redis_url = os.getenv("UPSTASH_REDIS_URL")
+        self.redis_token = os.getenv("UPSTASH_REDIS_TOKEN")
         self.memory_client = None
+        # Session the shared history client was first used for
+        self.memory_client_session: Optional[str] = None
+        
+        # Shared HTTP client for Make.com webhooks (created per worker on startup)
+        self.http_client: Optional[httpx.AsyncClient] = None
+        
+        # Set once the worker has warmed its outbound connections
+        self.ready = False
+        
+        # Last booking link Make.com returned per session, reused when the turn budget is low
+        self.booking_links: Dict[str, str] = {}
+        
+        # Count of turn-budget degradations per stage
+        self.degradation_counts: Dict[str, int] = {}
+        
+        # Lead-funnel events, written to disk in batches off the chat path
+        self.lead_events = LeadEventWriter()
+        
+        # History loads started when a socket connects, consumed by the first turn
+        self.prefetched: Dict[str, asyncio.Task] = {}
+        # Connect-time client warm-up, kept so it isn't garbage collected mid-flight
+        self.warm_task: Optional[asyncio.Task] = None
+        
+        # When the OpenAI and Make.com connection pools were last used
+        self.last_openai_call = 0.0
+        self.last_webhook_call = 0.0
+        
+        # Load-aware switch to cheaper response modes
+        self.brownout = BrownoutController()
         
         # Initialize memory clients dictionary
         self.memory_clients = {}
@@ -57,6 +272,136 @@ class ChatBot:
         # Track message counts per session
         self.message_counts = {}
 
+    def get_http_client(self) -> httpx.AsyncClient:
+        """Get the shared webhook HTTP client, creating it if needed."""
+        if self.http_client is None or self.http_client.is_closed:
+            self.http_client = httpx.AsyncClient(timeout=10.0)
+        return self.http_client
+
+    async def warm_up(self) -> None:
+        """Open connections to OpenAI, Upstash and Make.com before serving traffic."""
+        print("\n[Startup] Warming outbound connections...")
+
+        async def warm_openai() -> None:
+            # Any authenticated request opens the pooled connection used by completions
+            client = self.client.with_options(timeout=WARM_UP_TIMEOUT_SECONDS, max_retries=0)
+            await asyncio.to_thread(client.models.list)
+
+        async def warm_upstash() -> None:
+            # Ping through the history client's own connection so its pool is the one warmed
+            history = self.get_history_client()
+            await asyncio.to_thread(history.redis_client.ping)
+
+        warmers = {"OpenAI": warm_openai, "Upstash": warm_upstash, "Make.com": self.warm_webhook}
+        results = await asyncio.gather(
+            *(asyncio.wait_for(warm(), timeout=WARM_UP_TIMEOUT_SECONDS) for warm in warmers.values()),
+            return_exceptions=True
+        )
+        for name, result in zip(warmers, results):
+            if isinstance(result, asyncio.TimeoutError):
+                print(f"[Startup] Could not warm {name}: no response in {WARM_UP_TIMEOUT_SECONDS:.0f}s")
+            elif isinstance(result, Exception):
+                print(f"[Startup] Could not warm {name}: {str(result)}")
+            else:
+                print(f"[Startup] {name} connection ready")
+
+        # Readiness only gates on the warm-up attempt; failing dependencies are handled per request
+        self.ready = True
+
+    async def close(self) -> None:
+        """Release pooled connections on shutdown."""
+        self.ready = False
+        if self.warm_task is not None and not self.warm_task.done():
+            self.warm_task.cancel()
+        if self.http_client is not None:
+            await self.http_client.aclose()
+            self.http_client = None
+
+    async def create_completion(self, budget: Optional[TurnBudget] = None, purpose: str = "response", **kwargs):
+        """Run a chat completion off the event loop, bounded by the turn budget if given."""
+        client = self.client
+        if budget is not None:
+            # Retries would keep the worker thread busy long after the turn has given up on it
+            client = client.with_options(timeout=max(budget.remaining(), 0.1), max_retries=0)
+        if purpose == "response" and self.brownout.mode >= BROWNOUT_SHORT_RESPONSES:
+            kwargs["max_tokens"] = min(kwargs.get("max_tokens", BROWNOUT_MAX_TOKENS), BROWNOUT_MAX_TOKENS)
+        with tracer.span("openai.chat_completion", purpose=purpose, model=kwargs.get("model"),
+                         max_tokens=kwargs.get("max_tokens"), brownout_mode=self.brownout.mode) as span, \
+                self.brownout.llm_call():
+            completion = await asyncio.to_thread(profiler.run, client.chat.completions.create, **kwargs)
+            self.last_openai_call = time.monotonic()
+            if completion.usage is not None:
+                span.set_attribute("prompt_tokens", completion.usage.prompt_tokens)
+                span.set_attribute("completion_tokens", completion.usage.completion_tokens)
+            return completion
+
+    def start_prefetch(self, session_id: str) -> None:
+        """Start loading session history and state, and warming clients, as soon as a socket connects."""
+        if session_id not in self.prefetched:
+            self.prefetched[session_id] = asyncio.create_task(self.prefetch_session(session_id))
+        # Warm-up runs on its own so a slow dependency never delays the prefetched history
+        if self.warm_task is None or self.warm_task.done():
+            self.warm_task = asyncio.create_task(self.warm_model_clients())
+
+    async def prefetch_session(self, session_id: str) -> List:
+        """Load the session's history and state while the user is still typing."""
+        with tracer.span("session.prefetch", session_id=session_id) as span:
+            history, _ = await asyncio.gather(
+                self.get_chat_history(session_id),
+                self.load_session_state(session_id)
+            )
+            span.set_attribute("messages", len(history))
+            return history
+
+    async def warm_webhook(self, timeout: float = WARM_UP_TIMEOUT_SECONDS) -> None:
+        """Open a pooled connection to the Make.com host."""
+        # HEAD on the host only opens the TLS connection; it does not trigger the scenario
+        webhook_host = httpx.URL(MAKE_WEBHOOK_URL).copy_with(path="/")
+        await self.get_http_client().head(webhook_host, timeout=timeout)
+        self.last_webhook_call = time.monotonic()
+
+    async def warm_model_clients(self) -> None:
+        """Reopen the OpenAI and webhook connections if they have gone idle."""
+        now = time.monotonic()
+        if now - self.last_webhook_call >= POOL_KEEPALIVE_SECONDS:
+            try:
+                await self.warm_webhook(PREFETCH_WARM_TIMEOUT_SECONDS)
+            except Exception as e:
+                print(f"[Prefetch] Could not warm Make.com client: {str(e)}")
+        if now - self.last_openai_call >= POOL_KEEPALIVE_SECONDS:
+            try:
+                client = self.client.with_options(timeout=PREFETCH_WARM_TIMEOUT_SECONDS, max_retries=0)
+                await asyncio.to_thread(client.models.list)
+                self.last_openai_call = time.monotonic()
+            except Exception as e:
+                print(f"[Prefetch] Could not warm OpenAI client: {str(e)}")
+
+    async def get_turn_history(self, session_id: str) -> List:
+        """Use the history prefetched at connect time if there is one, else read it."""
+        prefetch = self.prefetched.pop(session_id, None)
+        if prefetch is not None:
+            history = await prefetch
+            print(f"[Prefetch] Using {len(history)} prefetched messages for session: {session_id}")
+            return history
+        return await self.get_chat_history(session_id)
+
+    async def wait_for_session_state(self, session_id: str) -> None:
+        """Wait for the connect-time prefetch so the turn sees the session's stored state."""
+        prefetch = self.prefetched.get(session_id)
+        if prefetch is not None:
+            await prefetch
+
+    def discard_prefetch(self, session_id: str) -> None:
+        """Drop an unused prefetch once history may have changed."""
+        prefetch = self.prefetched.pop(session_id, None)
+        if prefetch is not None and not prefetch.done():
+            prefetch.cancel()
+
+    def record_degradations(self, budget: TurnBudget) -> None:
+        """Add a finished turn's degradations to the per-stage counters."""
+        for stage in budget.degradations:
+            self.degradation_counts[stage] = self.degradation_counts.get(stage, 0) + 1
+
     def should_offer_consultation(self, message: str, state: dict) -> bool:
         """Check if we should offer a consultation based on user's message and context."""
         # Only suggest consultation after we understand their needs
@@ -89,12 +434,32 @@ class ChatBot:
         
         return False
 
-    async def process_message(self, message: str, session_id: str) -> str:
+    async def process_message(self, message: str, session_id: str, budget: Optional[TurnBudget] = None) -> str:
+        """Process a chat turn within the per-turn deadline."""
+        # Callers that pass a budget own it and record its degradations
+        owns_budget = budget is None
+        if owns_budget:
+            budget = TurnBudget(session_id)
+        with tracer.span("process_message", session_id=session_id) as span:
+            try:
+                return await asyncio.wait_for(
+                    self._process_message(message, session_id, budget),
+                    timeout=budget.remaining()
+                )
+            except asyncio.TimeoutError:
+                budget.degrade("turn_deadline")
+                return LLM_FALLBACK_REPLY
+            finally:
+                if owns_budget:
+                    self.record_degradations(budget)
+                span.set_attribute("degradations", ",".join(budget.degradations))
+
+    async def _process_message(self, message: str, session_id: str, budget: TurnBudget) -> str:
         try:
             print(f"\n[Process] Processing message for session: {session_id}")
             
             # Get history for context
-            history = await self.get_chat_history(session_id)
+            history = await self.get_turn_history(session_id)
             
             current_message = message.lower()
             
@@ -104,7 +469,7 @@ class ChatBot:
                 'talk with someone', 'discuss', 'appointment', 'call'
             ]
             if any(word in current_message for word in direct_consultation_requests):
-                return await self.handle_scheduling(session_id)
+                return await self.handle_scheduling(session_id, budget)
             
             if history and len(history) > 0:
                 last_bot_message = history[-1].content.lower()
@@ -129,7 +494,7 @@ class ChatBot:
                 is_positive = any(word in current_message for word in positive_responses)
                 
                 if consultation_suggested and is_positive:
-                    return await self.handle_scheduling(session_id)
+                    return await self.handle_scheduling(session_id, budget)
 
                 # Check for implementation or specific solution questions
                 implementation_triggers = [
@@ -139,8 +504,8 @@ class ChatBot:
                 if any(trigger in current_message for trigger in implementation_triggers):
                     return "I'd be happy to discuss implementation details. Would you like to schedule a consultation to explore this further?"
 
-                if is_acknowledgment(message):
-                    return await self.handle_acknowledgment(session_id)
+                if await asyncio.to_thread(profiler.run, is_acknowledgment, message, budget):
+                    return await self.handle_acknowledgment(session_id, budget)
 
             # Get or initialize state
             state = self.conversation_states.get(session_id, {})
@@ -157,18 +522,17 @@ class ChatBot:
             if self.message_counts[session_id] > 50:
                 return "I apologize, but you've reached the maximum number of messages for this session. Please schedule a consultation to discuss your needs in detail."
             
-            # Get chat history first
-            history = await self.get_chat_history(session_id)
+            # History was already read at the start of this turn
             print(f"[Process] Retrieved {len(history) if history else 0} messages from history")
             
             # For first message, determine if it's a greeting or direct question
             if len(history) == 0:
-                is_greeting = await self.is_greeting(message)
+                is_greeting = await self.is_greeting(message, budget)
                 
                 if is_greeting:
                     response = "Hello! What would you like to know about our AI solutions for businesses?"
                 else:
-                    response = await self.process_direct_question(message)
+                    response = await self.process_direct_question(message, budget)
                     
                 await self.save_chat_history(session_id, {"role": "user", "content": message})
                 await self.save_chat_history(session_id, {"role": "assistant", "content": response})
@@ -198,15 +562,23 @@ class ChatBot:
                     return response
                 
                 state['consultation_suggested'] = True
+                self.lead_events.record(session_id, CONSULTATION_SUGGESTED)
                 self.conversation_states[session_id] = state
-                return await self.handle_scheduling(session_id)
+                return await self.handle_scheduling(session_id, budget)
             
             # Move the relevance check after acknowledgment handling
-            relevance_check = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[{
-                    "role": "system", 
-                    "content": """You are an AI relevance filter for an AI consultancy business.
+            # Under brownout, use the local relevance check instead of the LLM filter
+            if self.brownout.mode >= BROWNOUT_LOCAL_CLASSIFIERS:
+                is_relevant = is_basic_relevant(message)
+            # Skip the relevance filter when the turn budget can't cover it
+            elif budget.allows(RELEVANCE_FILTER_RESERVE):
+                relevance_check = await self.create_completion(
+                    budget,
+                    purpose="relevance_filter",
+                    model="gpt-3.5-turbo",
+                    messages=[{
+                        "role": "system", 
+                        "content": """You are an AI relevance filter for an AI consultancy business.
                     
                     ALWAYS Answer Y for:
                     1. ANY acknowledgments (ok, sure, yes, thanks, etc.)
@@ -297,15 +669,18 @@ class ChatBot:
                     The goal is to maintain conversation flow and find business opportunities.
                     Err on the side of inclusion rather than exclusion.
                     Respond with single character: Y/N"""
-                }, {
-                    "role": "user",
-                    "content": message
-                }],
-                temperature=0,
-                max_tokens=1
-            )
+                    }, {
+                        "role": "user",
+                        "content": message
+                    }],
+                    temperature=0,
+                    max_tokens=1
+                )
 
-            is_relevant = relevance_check.choices[0].message.content.strip().upper() == 'Y'
+                is_relevant = relevance_check.choices[0].message.content.strip().upper() == 'Y'
+            else:
+                budget.degrade("relevance_filter")
+                is_relevant = True
             
             if not is_relevant:
                 return "I specialize in AI solutions for businesses. What challenges is your business facing?"
@@ -318,22 +693,24 @@ class ChatBot:
                 # Check for booking-related messages
                 if any(word in message.lower() for word in ['booked', 'scheduled', 'made an appointment']):
                     state['booking_completed'] = True
+                    self.lead_events.record(session_id, BOOKING_COMPLETED)
                     self.conversation_states[session_id] = state
                     response = "Excellent! We look forward to speaking with you. In the meantime, feel free to ask any other questions you might have."
                 
                 # Check for consultation interest
                 elif self.should_offer_consultation(message, state):
                     state['consultation_suggested'] = True
+                    self.lead_events.record(session_id, CONSULTATION_SUGGESTED)
                     self.conversation_states[session_id] = state
                     # Call Make.com webhook instead of direct Calendly
-                    return await self.handle_scheduling(session_id)
+                    return await self.handle_scheduling(session_id, budget)
                 
                 # Handle explicit booking requests
                 elif any(word in message.lower() for word in ['book', 'schedule', 'consultation', 'meet']):
-                    response = await self.handle_scheduling(session_id)
+                    response = await self.handle_scheduling(session_id, budget)
                 else:
                     # Get LLM response using chat history context
-                    response = await self.get_llm_response(message, session_id)
+                    response = await self.get_llm_response(message, session_id, budget)
             
             # Save both the user message and response to history
             await self.save_chat_history(session_id, {
@@ -379,19 +756,68 @@ class ChatBot:
             traceback.print_exc()
             raise
 
+    def get_history_client(self, session_id: Optional[str] = None) -> UpstashRedisChatMessageHistory:
+        """Get the shared history client, keyed to the first session that uses it."""
+        if not self.memory_client:
+            print(f"[Redis] Initializing new memory client for session: {session_id}")
+            self.memory_client = UpstashRedisChatMessageHistory(
+                url=os.getenv("UPSTASH_REDIS_URL"),
+                token=os.getenv("UPSTASH_REDIS_TOKEN"),
+                session_id=session_id or "",
+                ttl=86400
+            )
+        if self.memory_client_session is None and session_id:
+            # A client created during warm-up binds to the first real session
+            self.memory_client.session_id = session_id
+            self.memory_client_session = session_id
+        return self.memory_client
+
+    async def load_session_state(self, session_id: str) -> None:
+        """Load the session's conversation state, message count and booking link from Upstash."""
+        try:
+            redis_client = self.get_history_client(session_id).redis_client
+            with tracer.span("upstash.load_state") as span:
+                stored = await asyncio.to_thread(
+                    profiler.run, redis_client.get, SESSION_STATE_KEY_PREFIX + session_id
+                )
+                span.set_attribute("found", stored is not None)
+        except Exception as e:
+            print(f"[Redis] Error loading session state: {str(e)}")
+            self.conversation_states.setdefault(session_id, {})
+            return
+
+        # Upstash is the source of truth: a previous connection may have been served by another worker
+        data = json.loads(stored) if stored else {}
+        self.conversation_states[session_id] = data.get("state", {})
+        self.message_counts[session_id] = data.get("message_count", 0)
+        if data.get("booking_link"):
+            self.booking_links[session_id] = data["booking_link"]
+        else:
+            self.booking_links.pop(session_id, None)
+
+    async def save_session_state(self, session_id: str) -> None:
+        """Store the session's conversation state, message count and booking link in Upstash."""
+        data = {
+            "state": self.conversation_states.get(session_id, {}),
+            "message_count": self.message_counts.get(session_id, 0),
+            "booking_link": self.booking_links.get(session_id),
+        }
+        try:
+            redis_client = self.get_history_client(session_id).redis_client
+            with tracer.span("upstash.save_state"):
+                await asyncio.to_thread(
+                    profiler.run, redis_client.set, SESSION_STATE_KEY_PREFIX + session_id,
+                    json.dumps(data), ex=SESSION_STATE_TTL_SECONDS
+                )
+        except Exception as e:
+            print(f"[Redis] Error saving session state: {str(e)}")
+
     async def save_chat_history(self, session_id: str, message: dict) -> None:
         """Save chat message to history."""
         try:
             print(f"\n[Redis] Attempting to save message for session: {session_id}")
             # Initialize memory client if not exists
-            if not self.memory_client:
-                print(f"[Redis] Initializing new memory client for session: {session_id}")
-                self.memory_client = UpstashRedisChatMessageHistory(
-                    url=os.getenv("UPSTASH_REDIS_URL"),
-                    token=os.getenv("UPSTASH_REDIS_TOKEN"),
-                    session_id=session_id,
-                    ttl=86400
-                )
+            self.get_history_client(session_id)
             
             # Convert dict to ChatMessage format
             if message["role"] == "user":
@@ -399,7 +825,8 @@ class ChatBot:
             else:
                 chat_message = AIMessage(content=message["content"])
             
-            self.memory_client.add_message(chat_message)
+            with tracer.span("upstash.save_message", role=message["role"]):
+                await asyncio.to_thread(profiler.run, self.memory_client.add_message, chat_message)
             print(f"[Redis] Successfully saved message: {message['content'][:50]}...")
             
         except Exception as e:
@@ -411,15 +838,11 @@ class ChatBot:
         try:
             print(f"\n[Redis] Attempting to get history for session: {session_id}")
             # Initialize memory client if not exists
-            if not self.memory_client:
-                print(f"[Redis] Initializing new memory client for session: {session_id}")
-                self.memory_client = UpstashRedisChatMessageHistory(
-                    url=os.getenv("UPSTASH_REDIS_URL"),
-                    token=os.getenv("UPSTASH_REDIS_TOKEN"),
-                    session_id=session_id,
-                    ttl=86400
-                )
-            messages = self.memory_client.messages
+            self.get_history_client(session_id)
+            # Read off the event loop so the turn deadline can still fire
+            with tracer.span("upstash.get_history") as span:
+                messages = await asyncio.to_thread(profiler.run, lambda: self.memory_client.messages)
+                span.set_attribute("messages", len(messages))
             print(f"[Redis] Retrieved {len(messages)} messages from history")
             return messages
             
@@ -428,7 +851,12 @@ class ChatBot:
             traceback.print_exc()
             return []
 
-    async def get_llm_response(self, prompt: str, session_id: str) -> str:
+    async def get_llm_response(self, prompt: str, session_id: str, budget: Optional[TurnBudget] = None) -> str:
+        if budget is not None and not budget.allows(LLM_RESPONSE_RESERVE):
+            budget.degrade("llm_response")
+            return LLM_FALLBACK_REPLY
+        if self.brownout.mode >= BROWNOUT_CANNED_REPLIES:
+            return self.get_canned_reply(prompt, session_id)
         try:
             messages = [{
                 "role": "system", 
@@ -477,7 +905,9 @@ class ChatBot:
             # Add current prompt
             messages.append({"role": "user", "content": prompt})
 
-            completion = self.client.chat.completions.create(
+            completion = await self.create_completion(
+                budget,
+                purpose="response",
                 model="gpt-3.5-turbo",
                 messages=messages,
                 temperature=0.7,
@@ -489,7 +919,7 @@ class ChatBot:
 
         except Exception as e:
             print(f"Error in get_llm_response: {str(e)}")
-            return "I apologize, but I'm having trouble. Could you tell me more about what you're looking to achieve?"
+            return LLM_FALLBACK_REPLY
 
     def get_booking_link_response(self) -> str:
         """Generate booking link response when appropriate."""
@@ -500,6 +930,34 @@ class ChatBot:
             "linkText": "Book your consultation"
         })
 
+    def get_canned_reply(self, message: str, session_id: Optional[str]) -> str:
+        """Answer without the LLM under heavy load, pointing straight to booking."""
+        # Same topics process_direct_question answers without the LLM
+        if any(phrase in message.lower() for phrase in ['what services', 'kind of services', 'which services']):
+            answer = "We specialize in AI Strategy Development, AI-optimized Research & Data Analytics, and Business Process Automation."
+        else:
+            answer = "ricco.AI helps businesses achieve significant growth through strategic AI implementation."
+        if session_id:
+            self.lead_events.record(session_id, BOOKING_LINK_SERVED, source="brownout")
+        return json.dumps({
+            "type": "scheduling",
+            "message": f"{answer} The best way to see what we could do for you is a quick consultation:",
+            "url": "https://calendly.com/d/cqvb-cvn-6gc/15-minute-meeting",
+            "linkText": "Book your consultation"
+        })
+
+    def get_cached_booking_link_response(self, session_id: str) -> str:
+        """Reuse the session's last Make.com booking link, or the direct Calendly link."""
+        booking_url = self.booking_links.get(session_id)
+        if not booking_url:
+            return self.get_booking_link_response()
+        return json.dumps({
+            "type": "scheduling",
+            "message": "I understand you're interested in our services. Here's a link to schedule a consultation:",
+            "url": booking_url,
+            "linkText": "Book your consultation"
+        })
+
     def handle_booking_status(self, message: str, session_id: str) -> Optional[str]:
         """Handle booking-related messages."""
         state = self.conversation_states.get(session_id, {})
@@ -511,16 +969,18 @@ class ChatBot:
         # Check if user just completed booking
         if any(word in message.lower() for word in ['booked', 'scheduled', 'made an appointment', 'book it', 'booked it']):
             state['booking_completed'] = True
+            self.lead_events.record(session_id, BOOKING_COMPLETED)
             self.conversation_states[session_id] = state
             return "Excellent! We look forward to speaking with you. In the meantime, feel free to ask any other questions you might have."
             
         # Only offer booking if not already booked
         if any(word in message.lower() for word in ['yes', 'yeah', 'sure', 'ok']) and state.get('consultation_suggested'):
+            self.lead_events.record(session_id, BOOKING_LINK_SERVED, source="calendly")
             return self.get_booking_link_response()
             
         return None
 
-    async def handle_acknowledgment(self, session_id: str) -> str:
+    async def handle_acknowledgment(self, session_id: str, budget: Optional[TurnBudget] = None) -> str:
         """Handle user acknowledgments based on conversation context."""
         try:
             history = await self.get_chat_history(session_id)
@@ -536,11 +996,11 @@ class ChatBot:
                 'consultation', 'discuss', 'explore', 'interested', 'meeting',
                 'would you be interested', 'schedule', 'book', 'talk more'
             ]):
-                return await self.handle_scheduling(session_id)
+                return await self.handle_scheduling(session_id, budget)
             
             # If they've shown interest in specific solutions
             if any(topic in last_bot_message for topic in ['analytics', 'automation', 'strategy', 'implementation']):
-                return await self.handle_scheduling(session_id)
+                return await self.handle_scheduling(session_id, budget)
             
             # If they've expressed interest in data analytics
             if 'data analytics' in last_bot_message or 'analytics' in last_bot_message:
@@ -561,8 +1021,13 @@ class ChatBot:
             print(f"Error in handle_acknowledgment: {str(e)}")
             return "What specific challenges would you like to address?"
 
-    async def handle_scheduling(self, session_id: str) -> str:
+    async def handle_scheduling(self, session_id: str, budget: Optional[TurnBudget] = None) -> str:
         """Handle scheduling request through Make.com webhook."""
+        if budget is not None and not budget.allows(BOOKING_WEBHOOK_RESERVE):
+            budget.degrade("booking_webhook")
+            self.lead_events.record(session_id, BOOKING_LINK_SERVED, source="cached")
+            with tracer.span("booking.cached_link", cache_hit=session_id in self.booking_links):
+                return self.get_cached_booking_link_response(session_id)
         try:
             print(f"[Make.com] Sending scheduling request for session: {session_id}")
             
@@ -579,43 +1044,48 @@ class ChatBot:
             }
             
             # Send request to your specific Make.com webhook
-            async with httpx.AsyncClient() as client:
-                webhook_url = "https://hook.us1.make.com/ke4n6kdh0kxwwrljdq9jesotouirragi"
+            client = self.get_http_client()
+            with tracer.span("make.webhook", action="create_scheduling_link") as span:
                 response = await client.post(
-                    webhook_url,
+                    MAKE_WEBHOOK_URL,
                     json=payload,
-                    timeout=10.0
+                    timeout=min(10.0, budget.remaining()) if budget is not None else 10.0
                 )
-                
-                print(f"[Make.com] Response status: {response.status_code}")
-                print(f"[Make.com] Response body: {response.text}")
-                
-                if response.status_code == 200:
-                    try:
-                        data = response.json()
-                        booking_url = data.get("booking_url")
-                        if booking_url:
-                            return json.dumps({
-                                "type": "scheduling",
-                                "message": "I understand you're interested in our services. Here's a link to schedule a consultation:",
-                                "url": booking_url,
-                                "linkText": "Book your consultation"
-                            })
-                    except Exception as e:
-                        print(f"[Make.com] Error parsing response: {str(e)}")
-                
-                # Fallback to direct Calendly link
-                print("[Make.com] Falling back to direct Calendly link")
-                return self.get_booking_link_response()
+                span.set_attribute("status_code", response.status_code)
+            self.last_webhook_call = time.monotonic()
+            
+            print(f"[Make.com] Response status: {response.status_code}")
+            print(f"[Make.com] Response body: {response.text}")
+            
+            if response.status_code == 200:
+                try:
+                    data = response.json()
+                    booking_url = data.get("booking_url")
+                    if booking_url:
+                        self.booking_links[session_id] = booking_url
+                        self.lead_events.record(session_id, BOOKING_LINK_SERVED, source="make")
+                        return self.get_cached_booking_link_response(session_id)
+                except Exception as e:
+                    print(f"[Make.com] Error parsing response: {str(e)}")
+            
+            # Fallback to direct Calendly link
+            print("[Make.com] Falling back to direct Calendly link")
+            self.lead_events.record(session_id, BOOKING_LINK_SERVED, source="calendly")
+            return self.get_booking_link_response()
                 
         except Exception as e:
             print(f"[Make.com] Error: {str(e)}")
+            self.lead_events.record(session_id, BOOKING_LINK_SERVED, source="calendly")
             return self.get_booking_link_response()
 
-    async def is_greeting(self, message: str) -> bool:
+    async def is_greeting(self, message: str, budget: Optional[TurnBudget] = None) -> bool:
         """Use LLM to determine if a message is a greeting."""
+        if self.brownout.mode >= BROWNOUT_LOCAL_CLASSIFIERS:
+            return is_basic_greeting(message)
         try:
-            response = self.client.chat.completions.create(
+            response = await self.create_completion(
+                budget,
+                purpose="greeting_classifier",
                 model="gpt-3.5-turbo",
                 messages=[{
                     "role": "system",
@@ -643,10 +1113,9 @@ class ChatBot:
         except Exception as e:
             print(f"Error in greeting detection: {str(e)}")
             # Fallback to basic check
-            greetings = {'hi', 'hello', 'hey', 'good morning', 'good afternoon', 'good evening'}
-            return any(message.lower().startswith(g) for g in greetings)
+            return is_basic_greeting(message)
 
-    async def process_direct_question(self, message: str) -> str:
+    async def process_direct_question(self, message: str, budget: Optional[TurnBudget] = None) -> str:
         """Handle direct questions with lead generation focus."""
         # Handle services inquiry
         if any(phrase in message.lower() for phrase in ['what services', 'kind of services', 'which services']):
@@ -659,11 +1128,95 @@ Which of these areas would benefit your business most? """
             return "ricco.AI is a leading AI consultancy that helps businesses achieve significant growth through strategic AI implementation. Would you like to learn how we could help your business?"
             
         # For other questions, focus on scheduling a consultation
-        return await self.get_llm_response(message, None)
+        return await self.get_llm_response(message, None, budget)
 
 # Initialize chatbot instance
 chatbot = ChatBot()
 
+@app.on_event("startup")
+async def warm_up_clients():
+    """Warm outbound connection pools in each worker before it accepts traffic."""
+    chatbot.lead_events.start()
+    tracer.start()
+    await chatbot.warm_up()
+
+@app.on_event("shutdown")
+async def close_clients():
+    await chatbot.close()
+    chatbot.lead_events.stop()
+    tracer.stop()
+
+def is_admin(token: Optional[str]) -> bool:
+    """Admin endpoints are disabled unless ADMIN_TOKEN is set."""
+    admin_token = os.getenv("ADMIN_TOKEN")
+    return bool(admin_token) and token == admin_token
+
+@app.post("/admin/profile")
+async def start_profiling(turns: int = 10, seconds: float = 300.0, x_admin_token: Optional[str] = Header(None)):
+    """Run the sampling profiler over the next N turns handled by this worker, for at most `seconds`."""
+    if not is_admin(x_admin_token):
+        return JSONResponse(status_code=403, content={"status": "forbidden"})
+    profiler.arm(turns, seconds)
+    print(f"[Profiler] Armed for the next {turns} turns (expires in {seconds:.0f}s)")
+    return {"status": "armed", **profiler.status()}
+
+@app.get("/admin/profile")
+async def profiling_status(x_admin_token: Optional[str] = Header(None)):
+    if not is_admin(x_admin_token):
+        return JSONResponse(status_code=403, content={"status": "forbidden"})
+    return profiler.status()
+
+@app.get("/admin/status")
+async def worker_status(x_admin_token: Optional[str] = Header(None)):
+    """Per-worker counters: turn-budget degradations by stage and brownout mode changes."""
+    if not is_admin(x_admin_token):
+        return JSONResponse(status_code=403, content={"status": "forbidden"})
+    return {
+        "pid": os.getpid(),
+        "degradations": chatbot.degradation_counts,
+        "brownout": chatbot.brownout.status(),
+    }
+
+@app.get("/ready")
+async def readiness_check():
+    """Readiness probe: passes once this worker has warmed its connections."""
+    if not chatbot.ready:
+        return JSONResponse(status_code=503, content={"status": "warming"})
+    return {"status": "ready"}
+
+async def handle_turn(message: str, session_id: str) -> str:
+    """Handle a single chat message within the per-turn deadline."""
+    budget = TurnBudget(session_id)
+    try:
+        return await asyncio.wait_for(
+            route_turn(message, session_id, budget),
+            timeout=budget.remaining()
+        )
+    except asyncio.TimeoutError:
+        budget.degrade("turn_deadline")
+        return LLM_FALLBACK_REPLY
+    finally:
+        chatbot.record_degradations(budget)
+
+async def route_turn(message: str, session_id: str, budget: TurnBudget) -> str:
+    """Route a single chat message to the right handler."""
+    # State loaded at connect time may come from another worker's earlier turns
+    await chatbot.wait_for_session_state(session_id)
+
+    # Handle booking status first
+    booking_response = chatbot.handle_booking_status(message, session_id)
+    if booking_response:
+        print(f"[{session_id}] Booking response")
+        return booking_response
+
+    # Handle acknowledgments
+    if await asyncio.to_thread(profiler.run, is_acknowledgment, message, budget):
+        print(f"[{session_id}] Acknowledgment response")
+        return await chatbot.handle_acknowledgment(session_id, budget)
+
+    # Process regular message
+    return await chatbot.process_message(message, session_id, budget)
+
 @app.websocket("/ws/{session_id}")
 async def websocket_endpoint(websocket: WebSocket, session_id: str):
     """WebSocket endpoint for chat functionality."""
@@ -672,32 +1225,35 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
         await websocket.accept()
         print(f"WebSocket connection accepted for session: {session_id}")
         
+        # Overlap the cold history read and client warm-up with the user's typing
+        chatbot.start_prefetch(session_id)
+        
         while True:
             try:
                 print(f"[{session_id}] Waiting for message...")
                 message = await websocket.receive_text()
                 print(f"[{session_id}] Received message: {message}")
                 
-                # Handle booking status first
-                booking_response = chatbot.handle_booking_status(message, session_id)
-                if booking_response:
-                    print(f"[{session_id}] Sending booking response: {booking_response}")
-                    await websocket.send_text(booking_response)
-                    continue
-
-                # Handle acknowledgments
-                if is_acknowledgment(message):
-                    ack_response = await chatbot.handle_acknowledgment(session_id)
-                    print(f"[{session_id}] Sending acknowledgment response: {ack_response}")
-                    await websocket.send_text(ack_response)
-                    continue
-
-                # Process regular message
-                response = await chatbot.process_message(message, session_id)
+                profiled = profiler.turn_started()
+                chatbot.brownout.turn_started()
+                try:
+                    with tracer.span("chat.turn", session_id=session_id, profiled=profiled,
+                                     brownout_mode=chatbot.brownout.mode) as span:
+                        response = await handle_turn(message, session_id)
+                        span.set_attribute("response_chars", len(response))
+                finally:
+                    chatbot.brownout.turn_finished()
+                    chatbot.discard_prefetch(session_id)
+                    if profiled:
+                        profiler.turn_finished()
+                
                 print(f"[{session_id}] Sending response: {response}")
                 await websocket.send_text(response)
                 print(f"[{session_id}] Response sent successfully")
                 
+                # Persist after replying so the write stays off the turn's latency
+                await chatbot.save_session_state(session_id)
+                
             except WebSocketDisconnect:
                 print(f"[{session_id}] WebSocket disconnected")
                 break
@@ -712,15 +1268,24 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
     except Exception as e:
         print(f"Error accepting WebSocket connection: {str(e)}")
         traceback.print_exc()
+    finally:
+        chatbot.discard_prefetch(session_id)
 
-def is_acknowledgment(message: str) -> bool:
+def is_acknowledgment(message: str, budget: Optional[TurnBudget] = None) -> bool:
     """Use LLM to intelligently determine if a message is an acknowledgment."""
+    if chatbot.brownout.mode >= BROWNOUT_LOCAL_CLASSIFIERS:
+        return is_basic_acknowledgment(message)
+    client = chatbot.client
+    if budget is not None:
+        client = client.with_options(timeout=max(budget.remaining(), 0.1), max_retries=0)
     try:
-        response = chatbot.client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[{
-                "role": "system",
-                "content": """Determine if the given message is an acknowledgment or affirmative response.
+        with tracer.span("openai.chat_completion", purpose="acknowledgment_classifier", model="gpt-3.5-turbo") as span, \
+                chatbot.brownout.llm_call():
+            response = client.chat.completions.create(
+                model="gpt-3.5-turbo",
+                messages=[{
+                    "role": "system",
+                    "content": """Determine if the given message is an acknowledgment or affirmative response.
 
                 Examples of acknowledgments include (but are not limited to):
                 - Simple acknowledgments (ok, thanks, sure)
@@ -732,21 +1297,42 @@ def is_acknowledgment(message: str) -> bool:
                 Respond with a single character:
                 Y - if the message is an acknowledgment/affirmative
                 N - if it's not an acknowledgment"""
-            }, {
-                "role": "user",
-                "content": message
-            }],
-            temperature=0,
-            max_tokens=1
-        )
+                }, {
+                    "role": "user",
+                    "content": message
+                }],
+                temperature=0,
+                max_tokens=1
+            )
+            if response.usage is not None:
+                span.set_attribute("prompt_tokens", response.usage.prompt_tokens)
+                span.set_attribute("completion_tokens", response.usage.completion_tokens)
         
         return response.choices[0].message.content.strip().upper() == 'Y'
         
     except Exception as e:
         print(f"Error in acknowledgment detection: {str(e)}")
         # Fallback to basic check
-        basic_acknowledgments = {'yes', 'yeah', 'sure', 'ok', 'please', 'yep', 'yah'}
-        return any(word in message.lower().split() for word in basic_acknowledgments)
+        return is_basic_acknowledgment(message)
+
+def is_basic_acknowledgment(message: str) -> bool:
+    """Keyword acknowledgment check, used when the LLM classifier is unavailable."""
+    basic_acknowledgments = {'yes', 'yeah', 'sure', 'ok', 'please', 'yep', 'yah'}
+    return any(word in message.lower().split() for word in basic_acknowledgments)
+
+def is_basic_greeting(message: str) -> bool:
+    """Keyword greeting check, used when the LLM classifier is unavailable."""
+    greetings = {'hi', 'hello', 'hey', 'good morning', 'good afternoon', 'good evening'}
+    return any(message.lower().startswith(g) for g in greetings)
+
+def is_basic_relevant(message: str) -> bool:
+    """Keyword version of the relevance filter: only clearly off-topic requests fail."""
+    # Whole words only, and nothing a business could plausibly ask about
+    off_topic = {
+        'betting', 'gambling', 'casino', 'dating', 'girlfriend', 'boyfriend',
+        'recipe', 'recipes', 'horoscope', 'football', 'basketball', 'soccer'
+    }
+    return not any(word in off_topic for word in re.findall(r"[a-z]+", message.lower()))
 
 def is_booking_related(message: str) -> bool:
     """Check if message is related to booking/scheduling."""
@@ -807,4 +1393,16 @@ async def handle_contact(contact: ContactForm):
 # Run the application
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+    if workers > 1:
+        # Production mode: workers need an import string, run from the repo root
+        uvicorn.run(
+            "src.backend.main:app",
+            host="0.0.0.0",
+            port=int(os.getenv("PORT", "8000")),
+            workers=workers,
+            loop="uvloop",
+            http="httptools"
+        )
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=int(os.getenv("PORT", "8000")))
\ No newline at end of file
@@ -0,0 +1,297 @@
+"""
+Offline replay of recorded conversations against recording fakes of OpenAI,
+Upstash and Make.com. Reports LLM calls, tokens, Redis round trips, webhook
+hits and simulated latency per turn, and exits non-zero when a budget is exceeded.
+
+Conversations are JSONL, one per line:
+    {"session_id": "demo", "turns": ["hi", {"user": "what services?", "replies": {"relevance": "Y"}}]}
+
+Run from the repo root:
+    python -m src.backend.replay conversations.jsonl --max-llm-calls 4 --max-tokens 2500
+"""
+
+from typing import Dict, List, Optional
+import os
+import sys
+import json
+import asyncio
+import argparse
+from types import SimpleNamespace
+from collections import Counter
+import httpx
+
+# The app creates its OpenAI client at import time; the fake replaces it before use
+os.environ.setdefault("OPENAI_API_KEY", "replay")
+
+from src.backend import main  # noqa: E402
+
+# Simulated dependency latency in seconds
+OPENAI_BASE_LATENCY = 0.30
+OPENAI_PER_TOKEN_LATENCY = 0.015
+REDIS_LATENCY = 0.04
+WEBHOOK_LATENCY = 0.60
+
+# System prompt openings identify which classifier is calling
+CLASSIFIER_PROMPTS = {
+    "You are an AI relevance filter": "relevance",
+    "Determine if the given message is primarily a greeting": "greeting",
+    "Determine if the given message is an acknowledgment": "acknowledgment",
+}
+
+DEFAULT_RESPONSE = "That's a great question. What business challenge are you hoping AI could help with?"
+
+try:
+    import tiktoken
+    ENCODING = tiktoken.encoding_for_model("gpt-3.5-turbo")
+except Exception:
+    ENCODING = None
+
+
+def count_tokens(text: str) -> int:
+    if ENCODING is not None:
+        return len(ENCODING.encode(text))
+    return max(1, len(text) // 4)
+
+
+class CallRecorder:
+    """Counters for the turn being replayed."""
+
+    def __init__(self) -> None:
+        self.counts: Counter = Counter()
+        self.latency = 0.0
+        self.replies: Dict[str, str] = {}
+
+    def reset(self, replies: Optional[Dict[str, str]] = None) -> None:
+        self.counts = Counter()
+        self.latency = 0.0
+        self.replies = replies or {}
+
+
+class FakeCompletions:
+    """Stands in for `client.chat.completions`, answering from the recording."""
+
+    def __init__(self, recorder: CallRecorder) -> None:
+        self.recorder = recorder
+
+    def create(self, model: str, messages: List[Dict], max_tokens: int = 100, **kwargs):
+        system_prompt = messages[0]["content"].strip() if messages else ""
+        user_message = messages[-1]["content"]
+        kind = next((k for prefix, k in CLASSIFIER_PROMPTS.items() if system_prompt.startswith(prefix)), "response")
+        content = self.recorder.replies.get(kind) or self.default_reply(kind, user_message)
+
+        # ~4 tokens of framing per chat message, as counted by OpenAI
+        prompt_tokens = sum(count_tokens(m["content"]) + 4 for m in messages)
+        completion_tokens = min(max_tokens, count_tokens(content))
+
+        self.recorder.counts["llm_calls"] += 1
+        self.recorder.counts[f"llm_{kind}"] += 1
+        self.recorder.counts["prompt_tokens"] += prompt_tokens
+        self.recorder.counts["completion_tokens"] += completion_tokens
+        self.recorder.latency += OPENAI_BASE_LATENCY + OPENAI_PER_TOKEN_LATENCY * completion_tokens
+
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage=SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+        )
+
+    @staticmethod
+    def default_reply(kind: str, message: str) -> str:
+        # Same keyword checks the app falls back to, so routing matches production
+        if kind == "relevance":
+            return "Y"
+        if kind == "greeting":
+            return "Y" if main.is_basic_greeting(message) else "N"
+        if kind == "acknowledgment":
+            return "Y" if main.is_basic_acknowledgment(message) else "N"
+        return DEFAULT_RESPONSE
+
+
+class FakeModels:
+    """Stands in for `client.models`, which the app lists to warm the connection."""
+
+    def __init__(self, recorder: CallRecorder) -> None:
+        self.recorder = recorder
+
+    def list(self):
+        self.recorder.counts["openai_warmups"] += 1
+        self.recorder.latency += OPENAI_BASE_LATENCY
+        return SimpleNamespace(data=[])
+
+
+class FakeOpenAI:
+    def __init__(self, recorder: CallRecorder) -> None:
+        self.chat = SimpleNamespace(completions=FakeCompletions(recorder))
+        self.models = FakeModels(recorder)
+
+    def with_options(self, **options) -> "FakeOpenAI":
+        # Per-call timeouts and retries don't apply to the fake
+        return self
+
+
+class FakeRedis:
+    """Stands in for the history client's Upstash connection, used for session state."""
+
+    def __init__(self, recorder: CallRecorder) -> None:
+        self.recorder = recorder
+        self.values: Dict[str, str] = {}
+
+    def get(self, key: str) -> Optional[str]:
+        self.recorder.counts["redis_calls"] += 1
+        self.recorder.latency += REDIS_LATENCY
+        return self.values.get(key)
+
+    def set(self, key: str, value: str, ex: Optional[int] = None) -> None:
+        self.recorder.counts["redis_calls"] += 1
+        self.recorder.latency += REDIS_LATENCY
+        self.values[key] = value
+
+
+class FakeChatHistory:
+    """Stands in for UpstashRedisChatMessageHistory, one round trip per read or write."""
+
+    def __init__(self, recorder: CallRecorder) -> None:
+        self.recorder = recorder
+        self.stored: List = []
+        self.redis_client = FakeRedis(recorder)
+
+    @property
+    def messages(self) -> List:
+        self.recorder.counts["redis_calls"] += 1
+        self.recorder.latency += REDIS_LATENCY
+        return list(self.stored)
+
+    def add_message(self, message) -> None:
+        self.recorder.counts["redis_calls"] += 1
+        self.recorder.latency += REDIS_LATENCY
+        self.stored.append(message)
+
+
+def fake_make_client(recorder: CallRecorder) -> httpx.AsyncClient:
+    """httpx client whose transport answers Make.com webhooks locally."""
+    def handle(request: httpx.Request) -> httpx.Response:
+        if request.method == "HEAD":
+            # Connect-time warm-up of the pooled connection; doesn't run the scenario
+            recorder.counts["webhook_warmups"] += 1
+            return httpx.Response(200)
+        recorder.counts["webhook_calls"] += 1
+        recorder.latency += WEBHOOK_LATENCY
+        return httpx.Response(200, json={"booking_url": "https://calendly.com/replay/booking"})
+    return httpx.AsyncClient(transport=httpx.MockTransport(handle))
+
+
+def load_conversations(path: str) -> List[Dict]:
+    conversations = []
+    with open(path) as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            turns = [t if isinstance(t, dict) else {"user": t} for t in record["turns"]]
+            conversations.append({"session_id": record.get("session_id", f"replay-{line_no}"), "turns": turns})
+    return conversations
+
+
+async def replay_conversation(conversation: Dict) -> List[Dict]:
+    """Run one conversation through a fresh ChatBot wired to recording fakes."""
+    recorder = CallRecorder()
+    bot = main.ChatBot()
+    bot.client = FakeOpenAI(recorder)
+    bot.memory_client = FakeChatHistory(recorder)
+    bot.http_client = fake_make_client(recorder)
+    # Module-level handlers (acknowledgment classifier, routing) use the global instance
+    main.chatbot = bot
+
+    session_id = conversation["session_id"]
+    results = []
+    try:
+        for index, turn in enumerate(conversation["turns"]):
+            recorder.reset(turn.get("replies"))
+            if index == 0:
+                # As on socket connect; the prefetch and warm-up count towards the first turn
+                bot.start_prefetch(session_id)
+            response = await main.handle_turn(turn["user"], session_id)
+            bot.discard_prefetch(session_id)
+            await bot.save_session_state(session_id)
+            results.append({
+                "user": turn["user"],
+                "response": response,
+                "counts": dict(recorder.counts),
+                "latency": recorder.latency,
+            })
+    finally:
+        await bot.http_client.aclose()
+    return results
+
+
+def check_budgets(turn: Dict, args: argparse.Namespace) -> List[str]:
+    counts = turn["counts"]
+    limits = [
+        ("llm_calls", args.max_llm_calls),
+        ("redis_calls", args.max_redis_calls),
+        ("webhook_calls", args.max_webhook_calls),
+    ]
+    violations = [
+        f"{name} {counts.get(name, 0)} > {limit}"
+        for name, limit in limits if limit is not None and counts.get(name, 0) > limit
+    ]
+    tokens = counts.get("prompt_tokens", 0) + counts.get("completion_tokens", 0)
+    if args.max_tokens is not None and tokens > args.max_tokens:
+        violations.append(f"tokens {tokens} > {args.max_tokens}")
+    if args.max_latency is not None and turn["latency"] > args.max_latency:
+        violations.append(f"latency {turn['latency']:.2f}s > {args.max_latency}s")
+    return violations
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description="Replay recorded conversations and count dependency calls")
+    parser.add_argument("conversations", help="JSONL file of recorded conversations")
+    parser.add_argument("--max-llm-calls", type=int, help="Per-turn OpenAI call budget")
+    parser.add_argument("--max-tokens", type=int, help="Per-turn prompt+completion token budget")
+    parser.add_argument("--max-redis-calls", type=int, help="Per-turn Upstash round-trip budget")
+    parser.add_argument("--max-webhook-calls", type=int, help="Per-turn Make.com call budget")
+    parser.add_argument("--max-latency", type=float, help="Per-turn simulated latency budget in seconds")
+    parser.add_argument("--json", action="store_true", help="Print per-turn results as JSON")
+    args = parser.parse_args()
+
+    totals: Counter = Counter()
+    total_latency = 0.0
+    total_turns = 0
+    violations = []
+    report = []
+
+    for conversation in load_conversations(args.conversations):
+        turns = asyncio.run(replay_conversation(conversation))
+        report.append({"session_id": conversation["session_id"], "turns": turns})
+        for index, turn in enumerate(turns, 1):
+            totals.update(turn["counts"])
+            total_latency += turn["latency"]
+            total_turns += 1
+            for violation in check_budgets(turn, args):
+                violations.append(f"{conversation['session_id']} turn {index}: {violation}")
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"{'session':<20}{'turn':>5}{'llm':>6}{'prompt':>8}{'compl':>7}{'redis':>7}{'hook':>6}{'latency':>9}")
+        for conversation in report:
+            for index, turn in enumerate(conversation["turns"], 1):
+                c = turn["counts"]
+                print(f"{conversation['session_id'][:19]:<20}{index:>5}{c.get('llm_calls', 0):>6}"
+                      f"{c.get('prompt_tokens', 0):>8}{c.get('completion_tokens', 0):>7}"
+                      f"{c.get('redis_calls', 0):>7}{c.get('webhook_calls', 0):>6}{turn['latency']:>8.2f}s")
+        print(f"\nTotal over {total_turns} turns: {totals.get('llm_calls', 0)} LLM calls, "
+              f"{totals.get('prompt_tokens', 0)} prompt / {totals.get('completion_tokens', 0)} completion tokens, "
+              f"{totals.get('redis_calls', 0)} Redis round trips, {totals.get('webhook_calls', 0)} webhook calls, "
+              f"{total_latency:.2f}s simulated latency")
+        print(f"Connect-time warm-ups: {totals.get('openai_warmups', 0)} OpenAI, "
+              f"{totals.get('webhook_warmups', 0)} Make.com")
+
+    if violations:
+        print(f"\n{len(violations)} budget violation(s):", file=sys.stderr)
+        for violation in violations:
+            print(f"  {violation}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,301 @@
+"""
+Per-turn tracing and on-demand profiling for the ricco.AI chatbot.
+Spans are batched by a background thread and appended to a local file as
+OTLP/JSON lines, readable by the OpenTelemetry Collector's otlpjsonfile receiver.
+"""
+
+from typing import Any, Dict, List, Optional
+import os
+import sys
+import json
+import time
+import queue
+import secrets
+import threading
+import contextvars
+from collections import Counter
+from contextlib import contextmanager
+
+# Set TRACE_EXPORT_PATH to an empty string to turn span export off
+TRACE_EXPORT_PATH = os.getenv("TRACE_EXPORT_PATH", "traces.jsonl")
+# The export file is rotated to <path>.1 once it reaches this size
+TRACE_MAX_BYTES = int(os.getenv("TRACE_MAX_BYTES", str(50 * 1024 * 1024)))
+PROFILE_OUTPUT_DIR = os.getenv("PROFILE_OUTPUT_DIR", "profiles")
+
+# Span currently open in this task/thread; asyncio tasks and to_thread inherit it
+current_span: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+
+
+def otlp_value(value: Any) -> Dict:
+    """Encode an attribute value as an OTLP AnyValue."""
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class Span:
+    """A timed operation within a chat turn."""
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], attributes: Dict) -> None:
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.attributes = dict(attributes)
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        if value is not None:
+            self.attributes[key] = value
+
+    def to_otlp(self) -> Dict:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [{"key": k, "value": otlp_value(v)} for k, v in self.attributes.items()],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+class Tracer:
+    """Create nested spans and export finished ones to a file in batches."""
+
+    def __init__(self, service_name: str, export_path: str = TRACE_EXPORT_PATH, max_bytes: int = TRACE_MAX_BYTES,
+                 batch_size: int = 256, flush_interval: float = 2.0, max_queue: int = 20000) -> None:
+        self.service_name = service_name
+        self.export_path = export_path
+        self.enabled = bool(export_path)
+        self.max_bytes = max_bytes
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.finished: queue.Queue = queue.Queue(maxsize=max_queue)
+        self.thread: Optional[threading.Thread] = None
+        self.dropped = 0
+
+    def start(self) -> None:
+        """Start the background exporter thread."""
+        if not self.enabled or (self.thread is not None and self.thread.is_alive()):
+            return
+        self.thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Export queued spans and stop the exporter thread."""
+        if self.thread is None:
+            return
+        self.finished.put(None)
+        self.thread.join(timeout)
+        self.thread = None
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        """Open a span nested under the current one, or start a new trace."""
+        parent = current_span.get()
+        span = Span(
+            name,
+            trace_id=parent.trace_id if parent else secrets.token_hex(16),
+            parent_id=parent.span_id if parent else None,
+            attributes=attributes
+        )
+        token = current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            current_span.reset(token)
+            span.end_ns = time.time_ns()
+            if self.enabled:
+                try:
+                    self.finished.put_nowait(span)
+                except queue.Full:
+                    self.dropped += 1
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch: List[Span] = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    item = self.finished.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            if batch:
+                self._export(batch)
+
+    def _export(self, batch: List[Span]) -> None:
+        payload = {
+            "resourceSpans": [{
+                "resource": {"attributes": [
+                    {"key": "service.name", "value": otlp_value(self.service_name)},
+                    {"key": "process.pid", "value": otlp_value(os.getpid())},
+                ]},
+                "scopeSpans": [{
+                    "scope": {"name": "ricco.backend"},
+                    "spans": [span.to_otlp() for span in batch],
+                }],
+            }]
+        }
+        try:
+            if os.path.exists(self.export_path) and os.path.getsize(self.export_path) >= self.max_bytes:
+                os.replace(self.export_path, self.export_path + ".1")
+            with open(self.export_path, "a") as f:
+                f.write(json.dumps(payload) + "\n")
+        except Exception as e:
+            print(f"[Tracing] Error exporting {len(batch)} spans: {str(e)}")
+
+
+class TurnProfiler:
+    """Sampling profiler armed for the next N chat turns.
+
+    Samples only while a profiled turn is running, and only the threads doing
+    turn work: the event-loop thread and workers running calls through `run`.
+    Writes a speedscope profile that opens directly in https://www.speedscope.app
+as a flamegraph.
+    """
+
+    def __init__(self, output_dir: str = PROFILE_OUTPUT_DIR, interval: float = 0.005) -> None:
+        self.output_dir = output_dir
+        self.interval = interval
+        self.turns_left = 0
+        self.active_turns = 0
+        self.expires_at = 0.0
+        self.samples: Counter = Counter()
+        self.thread: Optional[threading.Thread] = None
+        self.turn_active = threading.Event()
+        self.loop_threads: set = set()
+        self.work_threads: Counter = Counter()
+        self.lock = threading.Lock()
+        self.last_output: Optional[str] = None
+
+    def arm(self, turns: int, max_seconds: float = 300.0) -> None:
+        """Profile the next `turns` chat turns, giving up after `max_seconds`."""
+        with self.lock:
+            self.turns_left = turns
+            self.expires_at = time.monotonic() + max_seconds
+            if self.thread is None or not self.thread.is_alive():
+                self.samples.clear()
+                self.loop_threads.clear()
+                self.thread = threading.Thread(target=self._sample, name="turn-profiler", daemon=True)
+                self.thread.start()
+
+    def status(self) -> Dict:
+        return {
+            "turns_left": self.turns_left,
+            "sampling": self.turn_active.is_set(),
+            "expires_in": max(0.0, self.expires_at - time.monotonic()) if self.turns_left else 0.0,
+            "last_output": self.last_output,
+        }
+
+    def turn_started(self) -> bool:
+        """Resume sampling if armed; returns whether this turn is profiled."""
+        with self.lock:
+            if self.turns_left <= 0 or time.monotonic() >= self.expires_at:
+                return False
+            self.turns_left -= 1
+            self.active_turns += 1
+            # Called from the event loop, which runs the turn's coroutines
+            self.loop_threads.add(threading.get_ident())
+            self.turn_active.set()
+            return True
+
+    def turn_finished(self) -> None:
+        """Pause sampling once no profiled turn is running."""
+        with self.lock:
+            self.active_turns -= 1
+            if self.active_turns <= 0:
+                self.active_turns = 0
+                self.turn_active.clear()
+
+    def run(self, fn, *args, **kwargs):
+        """Call `fn`, marking this thread as doing turn work so the sampler includes it."""
+        ident = threading.get_ident()
+        with self.lock:
+            self.work_threads[ident] += 1
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self.lock:
+                self.work_threads[ident] -= 1
+                if self.work_threads[ident] <= 0:
+                    del self.work_threads[ident]
+
+    def _done(self) -> bool:
+        with self.lock:
+            expired = time.monotonic() >= self.expires_at
+            return expired or (self.turns_left <= 0 and self.active_turns == 0)
+
+    def _sample(self) -> None:
+        while not self._done():
+            # Between turns nothing is sampled, so user typing time stays out of the profile
+            if not self.turn_active.wait(timeout=0.2):
+                continue
+            with self.lock:
+                targets = self.loop_threads | set(self.work_threads)
+            frames = sys._current_frames()
+            for thread_id in targets:
+                frame = frames.get(thread_id)
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+                    frame = frame.f_back
+                if stack:
+                    self.samples[tuple(reversed(stack))] += 1
+            time.sleep(self.interval)
+
+        with self.lock:
+            self.turns_left = 0
+            self.turn_active.clear()
+        self.last_output = self._save()
+
+    def _save(self) -> str:
+        # Speedscope's sampled format: a shared frame table, then root-first stacks of frame indexes
+        frame_index: Dict = {}
+        stacks, weights = [], []
+        for stack, count in self.samples.most_common():
+            stacks.append([frame_index.setdefault(frame, len(frame_index)) for frame in stack])
+            weights.append(count * self.interval)
+        name = f"turns-{int(time.time())}-{os.getpid()}"
+        profile = {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": [
+                {"name": fn, "file": filename, "line": line} for fn, filename, line in frame_index
+            ]},
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": stacks,
+                "weights": weights,
+            }],
+            "name": name,
+            "exporter": "ricco.backend",
+        }
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(self.output_dir, f"{name}.speedscope.json")
+        with open(path, "w") as f:
+            json.dump(profile, f)
+        print(f"[Profiler] Saved {sum(self.samples.values())} samples to {path}")
+        return path